@@ -3,13 +3,58 @@ AI service for generating cost savings reports using OpenAI.
 Supports both real OpenAI API and mock mode for testing.
 """
 
+import asyncio
+import io
+import json
 import os
-from typing import Optional
-from app.models import AnalysisSummary, CostSavingsReport
+from typing import Any, Dict, List, Optional, Tuple, Union
+from app.models import (
+    AnalysisSummary,
+    CostSavingsReport,
+    CostSavingsReportLLM,
+    BatchReportSubmission,
+    BatchReportStatus,
+    ReportResult
+)
+from app.llm_cache import LLMCache
 
 
 class AIService:
     """Service for AI-powered report generation"""
+
+    # Structured outputs require gpt-4o-2024-08-06 or later
+    MODEL = "gpt-4o-2024-08-06"
+    TEMPERATURE = 0.7
+    # Batch states after which OpenAI will not produce more output
+    BATCH_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+    # Static instructions live entirely in the system message; per-request
+    # data goes only in the user message (see _build_prompt).
+    # Never format per-request data into this string.
+    SYSTEM_PROMPT = (
+        "You are a senior DevOps and cloud cost optimization expert. "
+        "Analyze cloud cost data and provide actionable recommendations "
+        "for cost savings. Be specific, data-driven, and prioritize "
+        "high-impact actions.\n"
+        "\n"
+        "Each request contains a summary of cloud cost data followed by the "
+        "top resources in three categories:\n"
+        "- Underutilized: active resources with CPU and memory below 20%. "
+        "Right-sizing to a smaller instance type typically saves ~30%.\n"
+        "- Idle: resources with status 'idle' or CPU and memory below 5%. "
+        "Stopping or terminating them typically saves ~80%.\n"
+        "- High-Cost Anomalies: resources costing more than 2x the average. "
+        "Reserved or spot instances and optimization typically save ~20%.\n"
+        "\n"
+        "Generate a comprehensive cost savings report with:\n"
+        "1. Executive summary (2-3 sentences)\n"
+        "2. Key findings (bullet points)\n"
+        "3. Actionable recommendations (prioritized)\n"
+        "4. Priority actions (top 3-5 actions to take immediately)\n"
+        "\n"
+        "Refer to resources by service name and quote dollar amounts from "
+        "the data. Example priority action (fictitious resource): "
+        "\"Terminate example-service-a (idle, $10.00/day) to save ~$240/month.\""
+    )
     
     def __init__(self, use_mock: bool = False, api_key: Optional[str] = None):
         """
@@ -21,6 +66,10 @@ class AIService:
         """
         self.use_mock = use_mock
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        # Sampling at temperature 0.7 is non-deterministic, so entries expire after an hour
+        self.cache = LLMCache(ttl_seconds=3600.0)
+        # (filename, summary) sent in each Batch API job, keyed by batch id then custom_id
+        self._batch_requests: Dict[str, Dict[str, Tuple[str, AnalysisSummary]]] = {}
         
         if not use_mock and not self.api_key:
             raise ValueError(
@@ -29,14 +78,27 @@ class AIService:
         
         if not use_mock:
             try:
-                import openai
-                self.client = openai.OpenAI(api_key=self.api_key)
+                import httpx
+                from openai import AsyncOpenAI
+                # One pooled HTTP client per service keeps TCP/TLS connections alive across requests
+                self.client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    http_client=httpx.AsyncClient(
+                        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+                        timeout=60.0
+                    )
+                )
             except ImportError:
                 raise ImportError(
                     "openai package required. Install with: pip install openai"
                 )
 
-    def generate_cost_savings_report(
+    async def close(self) -> None:
+        """Close the underlying HTTP connection pool"""
+        if not self.use_mock:
+            await self.client.close()
+
+    async def generate_cost_savings_report(
         self,
         analysis_summary: AnalysisSummary
     ) -> CostSavingsReport:
@@ -52,7 +114,7 @@ class AIService:
         if self.use_mock:
             return self._generate_mock_report(analysis_summary)
         else:
-            return self._generate_openai_report(analysis_summary)
+            return await self._generate_openai_report(analysis_summary)
 
     def _generate_mock_report(
         self,
@@ -60,6 +122,9 @@ class AIService:
     ) -> CostSavingsReport:
         """Generate mock report for testing"""
         
+        # Shared by findings and priority actions: 80% of idle monthly spend
+        idle_savings = sum(r.monthly_cost_estimate for r in analysis_summary.idle_resources) * 0.8
+        
         summary_text = (
             f"Analysis of {analysis_summary.total_records} cloud resources reveals "
             f"significant cost optimization opportunities. Current monthly spend is "
@@ -72,7 +137,7 @@ class AIService:
             findings.append(
                 f"Found {analysis_summary.idle_count} idle resources that can be "
                 f"stopped or terminated, saving approximately "
-                f"${sum(r.monthly_cost_estimate * 0.8 for r in analysis_summary.idle_resources):,.2f}/month"
+                f"${idle_savings:,.2f}/month"
             )
         if analysis_summary.underutilized_count > 0:
             findings.append(
@@ -112,7 +177,7 @@ class AIService:
         if analysis_summary.idle_resources:
             priority_actions.append(
                 f"Terminate {len(analysis_summary.idle_resources)} idle resources "
-                f"(highest impact: ${sum(r.monthly_cost_estimate * 0.8 for r in analysis_summary.idle_resources):,.2f}/month savings)"
+                f"(highest impact: ${idle_savings:,.2f}/month savings)"
             )
         if analysis_summary.underutilized_resources:
             priority_actions.append(
@@ -134,50 +199,249 @@ class AIService:
             analysis_summary=analysis_summary
         )
 
-    def _generate_openai_report(
+    async def _generate_openai_report(
         self,
         analysis_summary: AnalysisSummary
     ) -> CostSavingsReport:
         """Generate report using OpenAI API"""
         
-        # Build prompt
-        prompt = self._build_prompt(analysis_summary)
+        # Key on exactly what is sent (model, prompts, sampling params), not
+        # the full summary: the prompt only carries totals and top resources
+        body = self._build_completion_body(analysis_summary)
+        cache_key = LLMCache.make_key(**body)
+        
+        # The model's answer is cached; the report is rebuilt around the current summary
+        llm_report = self.cache.get(cache_key)
+        if llm_report is None:
+            # Call OpenAI API with structured outputs so the reply matches the schema
+            completion = await self.client.beta.chat.completions.parse(
+                **body,
+                response_format=CostSavingsReportLLM
+            )
+            
+            llm_report = completion.choices[0].message.parsed
+            
+            # Fallback to mock if the model refused to answer
+            if llm_report is None:
+                return self._generate_mock_report(analysis_summary)
+            
+            self.cache.set(cache_key, llm_report)
+        
+        return self._build_report(llm_report, analysis_summary)
+
+    async def generate_many(
+        self,
+        summaries: List[AnalysisSummary],
+        concurrency: int = 20
+    ) -> List[Union[CostSavingsReport, Exception]]:
+        """
+        Generate reports for many summaries concurrently.
+        
+        At most `concurrency` OpenAI calls are in flight at once to respect
+        rate limits. A failed call doesn't cancel the rest: its exception is
+        returned in its place so callers can report it explicitly.
+        
+        Args:
+            summaries: Analysis summaries to generate reports for
+            concurrency: Maximum number of concurrent requests
+            
+        Returns:
+            Reports in the same order as summaries, with the raised exception
+            in place of each report that failed
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _bounded(summary: AnalysisSummary) -> CostSavingsReport:
+            async with semaphore:
+                return await self.generate_cost_savings_report(summary)
+
+        return await asyncio.gather(
+            *[_bounded(summary) for summary in summaries],
+            return_exceptions=True
+        )
+
+    async def submit_batch_report(
+        self,
+        summaries: List[Tuple[str, AnalysisSummary]]
+    ) -> BatchReportSubmission:
+        """
+        Submit report generation for many summaries through the OpenAI Batch API.
+        
+        Batch jobs are billed at 50% of the synchronous price and complete
+        within 24 hours, which suits nightly or multi-tenant reporting.
+        
+        Args:
+            summaries: (filename, analysis summary) pairs to generate reports for
+            
+        Returns:
+            BatchReportSubmission with the batch id to poll and the
+            custom_id -> filename mapping of its requests
+        """
+        if self.use_mock:
+            raise ValueError("Batch reports require the OpenAI API. Set OPENAI_API_KEY")
+        
+        # One JSONL request line per summary; results are matched back by custom_id
+        requests_by_id = {
+            f"report-{i}": (filename, summary)
+            for i, (filename, summary) in enumerate(summaries)
+        }
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    **self._build_completion_body(summary),
+                    "response_format": self._batch_response_format()
+                }
+            })
+            for custom_id, (_, summary) in requests_by_id.items()
+        ]
+        jsonl = ("\n".join(lines) + "\n").encode("utf-8")
+        
+        input_file = await self.client.files.create(
+            file=("batch_reports.jsonl", io.BytesIO(jsonl)),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        self._batch_requests[batch.id] = requests_by_id
+        return BatchReportSubmission(
+            batch_id=batch.id,
+            requests_submitted=len(requests_by_id),
+            requests={
+                custom_id: filename
+                for custom_id, (filename, _) in requests_by_id.items()
+            }
+        )
+
+    async def get_batch_report(self, batch_id: str) -> BatchReportStatus:
+        """
+        Poll a Batch API job and parse its results once it has finished.
+        
+        Once the batch reaches a terminal state (completed, failed, expired
+        or cancelled), the output file is parsed and one result per request
+        is returned in submission order, matched by custom_id (OpenAI doesn't
+        keep output lines in input order). The stored summaries are then
+        dropped, so later polls for the same id raise KeyError.
+        
+        Args:
+            batch_id: Id returned by submit_batch_report
+            
+        Returns:
+            BatchReportStatus with results filled in when the batch has finished
+        """
+        if self.use_mock:
+            raise ValueError("Batch reports require the OpenAI API. Set OPENAI_API_KEY")
+        
+        requests_by_id = self._batch_requests.get(batch_id)
+        if requests_by_id is None:
+            raise KeyError(batch_id)
         
-        # Call OpenAI API
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
+        batch = await self.client.batches.retrieve(batch_id)
+        status = BatchReportStatus(
+            batch_id=batch_id,
+            status=batch.status,
+            requests_submitted=len(requests_by_id)
+        )
+        
+        if batch.status not in self.BATCH_TERMINAL_STATUSES:
+            return status
+        
+        # Expired and cancelled batches can still carry partial output
+        llm_reports: Dict[str, CostSavingsReportLLM] = {}
+        output_file_id = getattr(batch, "output_file_id", None)
+        if output_file_id:
+            output = await self.client.files.content(output_file_id)
+            llm_reports = self._parse_batch_output(output.text)
+        
+        # Every request without a valid report failed; this covers the
+        # error file's entries without downloading it
+        for custom_id, (filename, summary) in requests_by_id.items():
+            llm_report = llm_reports.get(custom_id)
+            if llm_report is None:
+                status.results.append(ReportResult(
+                    custom_id=custom_id,
+                    filename=filename,
+                    error=f"No valid report in batch output (batch status: {batch.status})"
+                ))
+            else:
+                status.results.append(ReportResult(
+                    custom_id=custom_id,
+                    filename=filename,
+                    report=self._build_report(llm_report, summary)
+                ))
+        
+        self._batch_requests.pop(batch_id, None)
+        return status
+
+    @staticmethod
+    def _parse_batch_output(text: str) -> Dict[str, CostSavingsReportLLM]:
+        """
+        Parse a batch output file into reports keyed by custom_id.
+        
+        Lines that failed, are malformed, or hold a report that doesn't match
+        the schema (e.g. truncated at max_tokens) are logged and skipped, so
+        one bad line doesn't lose the rest of the batch.
+        """
+        parsed = {}
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            custom_id = "unknown"
+            try:
+                result = json.loads(line)
+                custom_id = result.get("custom_id", custom_id)
+                response = result.get("response") or {}
+                if response.get("status_code") != 200:
+                    continue
+                
+                ai_response = response["body"]["choices"][0]["message"]["content"]
+                if not ai_response:
+                    continue
+                
+                parsed.setdefault(custom_id, CostSavingsReportLLM.model_validate_json(ai_response))
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+                print(f"Invalid batch output for {custom_id}: {e}")
+        return parsed
+
+    def _build_completion_body(self, analysis_summary: AnalysisSummary) -> Dict[str, Any]:
+        """Build chat completion request parameters shared by sync and batch calls"""
+        return {
+            "model": self.MODEL,
+            "messages": [
                 {
                     "role": "system",
-                    "content": (
-                        "You are a senior DevOps and cloud cost optimization expert. "
-                        "Analyze cloud cost data and provide actionable recommendations "
-                        "for cost savings. Be specific, data-driven, and prioritize "
-                        "high-impact actions."
-                    )
+                    "content": self.SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
-                    "content": prompt
+                    "content": self._build_prompt(analysis_summary)
                 }
             ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        
-        # Parse response (simplified - in production, use structured output)
-        ai_response = response.choices[0].message.content
-        
-        # For now, extract structured data from AI response
-        # In production, use OpenAI's structured outputs or function calling
-        return self._parse_ai_response(ai_response, analysis_summary)
+            "temperature": self.TEMPERATURE,
+            "max_tokens": 2000
+        }
 
-    def _build_prompt(self, analysis_summary: AnalysisSummary) -> str:
-        """Build prompt for OpenAI"""
-        prompt = f"""
-Analyze the following cloud cost data and generate a comprehensive cost savings report.
+    @staticmethod
+    def _batch_response_format() -> Dict[str, Any]:
+        """JSON schema response format for batch requests (parse() only works synchronously)"""
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "cost_savings_report",
+                "strict": True,
+                "schema": CostSavingsReportLLM.model_json_schema()
+            }
+        }
 
-Summary:
+    def _build_prompt(self, analysis_summary: AnalysisSummary) -> str:
+        """Build user prompt for OpenAI (variable data only, see SYSTEM_PROMPT)"""
+        prompt = f"""Summary:
 - Total Resources: {analysis_summary.total_records}
 - Total Daily Cost: ${analysis_summary.total_daily_cost:,.2f}
 - Total Monthly Cost Estimate: ${analysis_summary.total_monthly_cost_estimate:,.2f}
@@ -207,66 +471,19 @@ Underutilized Resources:
             prompt += f"- {resource.service} ({resource.instance_type}): "
             prompt += f"Cost: ${resource.daily_cost}/day\n"
 
-        prompt += """
-Please provide:
-1. Executive summary (2-3 sentences)
-2. Key findings (bullet points)
-3. Actionable recommendations (prioritized)
-4. Priority actions (top 3-5 actions to take immediately)
-
-Format your response in a structured way that can be parsed.
-"""
         return prompt
 
-    def _parse_ai_response(
+    def _build_report(
         self,
-        ai_response: str,
+        llm_report: CostSavingsReportLLM,
         analysis_summary: AnalysisSummary
     ) -> CostSavingsReport:
-        """Parse AI response into structured report"""
-        # Simplified parsing - in production, use structured outputs
-        lines = ai_response.split('\n')
-        
-        # Extract summary (first paragraph)
-        summary = ""
-        findings = []
-        recommendations = []
-        priority_actions = []
-        
-        current_section = None
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            if 'summary' in line.lower() or 'executive' in line.lower():
-                current_section = 'summary'
-            elif 'finding' in line.lower():
-                current_section = 'findings'
-            elif 'recommendation' in line.lower():
-                current_section = 'recommendations'
-            elif 'priority' in line.lower() or 'action' in line.lower():
-                current_section = 'priority'
-            elif line.startswith('-') or line.startswith('•') or line.startswith('*'):
-                item = line.lstrip('-•* ').strip()
-                if current_section == 'findings':
-                    findings.append(item)
-                elif current_section == 'recommendations':
-                    recommendations.append(item)
-                elif current_section == 'priority':
-                    priority_actions.append(item)
-            elif current_section == 'summary' and not summary:
-                summary = line
-        
-        # Fallback to mock if parsing fails
-        if not summary or not findings:
-            return self._generate_mock_report(analysis_summary)
-        
+        """Build report from the model's structured output"""
         return CostSavingsReport(
-            summary=summary or f"Analysis of {analysis_summary.total_records} resources.",
-            findings=findings[:10] or ["Review cost data for optimization opportunities"],
-            recommendations=recommendations[:10] or ["Implement cost monitoring"],
+            summary=llm_report.summary or f"Analysis of {analysis_summary.total_records} resources.",
+            findings=llm_report.findings[:10] or ["Review cost data for optimization opportunities"],
+            recommendations=llm_report.recommendations[:10] or ["Implement cost monitoring"],
             estimated_savings=analysis_summary.potential_monthly_savings,
-            priority_actions=priority_actions[:5] or ["Review findings"],
+            priority_actions=llm_report.priority_actions[:5] or ["Review findings"],
             analysis_summary=analysis_summary
         )
@@ -3,8 +3,151 @@ Cost analysis logic for detecting underutilized resources,
 idle resources, and high-cost anomalies.
 """
 
-from typing import List, Tuple
-from app.models import CostRecord, CostRecordResponse, AnalysisSummary
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple, Union
+import numpy as np
+from app.models import (
+    CostRecord,
+    CostRecordRaw,
+    CostRecordResponse,
+    AnalysisSummary,
+    ResourceStatus,
+    STRIP_PERCENT
+)
+
+
+# Status codes used by CostArrays.status (uint8 index into STATUS_VALUES)
+STATUS_VALUES = [status.value for status in ResourceStatus]
+STATUS_CODES = {value: code for code, value in enumerate(STATUS_VALUES)}
+
+
+@dataclass(frozen=True)
+class CostArrays:
+    """
+    Structure-of-arrays storage for cost records: one NumPy array per column.
+    
+    Holding columns instead of N CostRecord instances avoids per-object
+    overhead and lets analysis run as vectorized masks. CostRecord objects
+    are rebuilt lazily with record(i) only for rows that are emitted.
+    """
+    service: np.ndarray  # Service/resource name (object)
+    region: np.ndarray  # Region (object)
+    instance_type: np.ndarray  # Instance or resource type (object)
+    usage_cpu_avg: np.ndarray  # Original CPU usage strings (object)
+    usage_mem_avg: np.ndarray  # Original memory usage strings (object)
+    date: np.ndarray  # Record date (datetime64[D])
+    cost: np.ndarray  # Daily cost in USD (float64)
+    cpu: np.ndarray  # CPU usage percentage (float64)
+    mem: np.ndarray  # Memory usage percentage (float64)
+    status: np.ndarray  # Resource status code (uint8, see STATUS_CODES)
+
+    def __len__(self) -> int:
+        return len(self.cost)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Union[CostRecord, CostRecordRaw]]
+    ) -> "CostArrays":
+        """Build column arrays in one pass; records may be a generator"""
+        service, region, instance_type = [], [], []
+        usage_cpu_avg, usage_mem_avg, date = [], [], []
+        cost, cpu, mem, status = [], [], [], []
+
+        for record in records:
+            service.append(record.service)
+            region.append(record.region)
+            instance_type.append(record.instance_type)
+            usage_cpu_avg.append(record.usage_cpu_avg)
+            usage_mem_avg.append(record.usage_mem_avg)
+            date.append(record.date)
+            cost.append(record.daily_cost)
+            cpu.append(record.usage_cpu_avg_float)
+            mem.append(record.usage_mem_avg_float)
+            status.append(STATUS_CODES[record.status])
+
+        return cls(
+            service=np.array(service, dtype=object),
+            region=np.array(region, dtype=object),
+            instance_type=np.array(instance_type, dtype=object),
+            usage_cpu_avg=np.array(usage_cpu_avg, dtype=object),
+            usage_mem_avg=np.array(usage_mem_avg, dtype=object),
+            date=np.array(date, dtype="datetime64[D]"),
+            cost=np.array(cost, dtype=np.float64),
+            cpu=np.array(cpu, dtype=np.float64),
+            mem=np.array(mem, dtype=np.float64),
+            status=np.array(status, dtype=np.uint8)
+        )
+
+    def record(self, i: int) -> CostRecord:
+        """Rebuild the CostRecord at row i (columns were validated at ingest)"""
+        return CostRecord.model_construct(
+            service=self.service[i],
+            region=self.region[i],
+            instance_type=self.instance_type[i],
+            daily_cost=float(self.cost[i]),
+            usage_cpu_avg=self.usage_cpu_avg[i],
+            usage_mem_avg=self.usage_mem_avg[i],
+            date=self.date[i].item(),
+            status=STATUS_VALUES[self.status[i]],
+            usage_cpu_avg_float=float(self.cpu[i]),
+            usage_mem_avg_float=float(self.mem[i])
+        )
+
+    def responses(
+        self,
+        rows: np.ndarray,
+        is_underutilized: np.ndarray,
+        is_idle: np.ndarray,
+        is_high_cost_anomaly: np.ndarray
+    ) -> List[CostRecordResponse]:
+        """
+        Build CostRecordResponse objects for the given row indices in bulk.
+        
+        Each column is sliced and converted to Python values once, and the
+        responses are created with model_construct since the columns were
+        validated at ingest. Flag arrays are aligned with rows.
+        """
+        statuses = np.array(STATUS_VALUES, dtype=object)[self.status[rows]]
+        cost = self.cost[rows]
+        columns = zip(
+            self.service[rows].tolist(),
+            self.region[rows].tolist(),
+            self.instance_type[rows].tolist(),
+            cost.tolist(),
+            self.usage_cpu_avg[rows].tolist(),
+            self.usage_mem_avg[rows].tolist(),
+            self.date[rows].tolist(),
+            statuses.tolist(),
+            self.cpu[rows].tolist(),
+            self.mem[rows].tolist(),
+            (cost * 30).tolist(),
+            is_underutilized.tolist(),
+            is_idle.tolist(),
+            is_high_cost_anomaly.tolist()
+        )
+        return [
+            CostRecordResponse.model_construct(
+                service=service,
+                region=region,
+                instance_type=instance_type,
+                daily_cost=daily_cost,
+                usage_cpu_avg=usage_cpu_avg,
+                usage_mem_avg=usage_mem_avg,
+                date=date,
+                status=status,
+                usage_cpu_avg_float=cpu,
+                usage_mem_avg_float=mem,
+                monthly_cost_estimate=monthly_cost_estimate,
+                is_underutilized=underutilized,
+                is_idle=idle,
+                is_high_cost_anomaly=anomaly
+            )
+            for (
+                service, region, instance_type, daily_cost, usage_cpu_avg, usage_mem_avg,
+                date, status, cpu, mem, monthly_cost_estimate, underutilized, idle, anomaly
+            ) in columns
+        ]
 
 
 class CostAnalyzer:
@@ -22,9 +165,14 @@ class CostAnalyzer:
 
     @staticmethod
     def parse_usage_percentage(usage_str: str) -> float:
-        """Parse percentage string to float"""
+        """
+        Parse percentage string to float.
+        
+        Not used by the analysis itself (records carry pre-parsed *_float
+        fields); kept for API compatibility.
+        """
         if isinstance(usage_str, str):
-            return float(usage_str.replace('%', ''))
+            return float(usage_str.translate(STRIP_PERCENT))
         return float(usage_str)
 
     @classmethod
@@ -33,13 +181,10 @@ class CostAnalyzer:
         Check if resource is underutilized.
         Criteria: CPU < 20% AND Memory < 20% AND status is active
         """
-        cpu = cls.parse_usage_percentage(record.usage_cpu_avg)
-        mem = cls.parse_usage_percentage(record.usage_mem_avg)
-        
         return (
             record.status == "active" and
-            cpu < cls.UNDERUTILIZED_CPU_THRESHOLD and
-            mem < cls.UNDERUTILIZED_MEM_THRESHOLD
+            record.usage_cpu_avg_float < cls.UNDERUTILIZED_CPU_THRESHOLD and
+            record.usage_mem_avg_float < cls.UNDERUTILIZED_MEM_THRESHOLD
         )
 
     @classmethod
@@ -51,12 +196,9 @@ class CostAnalyzer:
         if record.status == "idle":
             return True
         
-        cpu = cls.parse_usage_percentage(record.usage_cpu_avg)
-        mem = cls.parse_usage_percentage(record.usage_mem_avg)
-        
         return (
-            cpu < cls.IDLE_CPU_THRESHOLD and
-            mem < cls.IDLE_MEM_THRESHOLD
+            record.usage_cpu_avg_float < cls.IDLE_CPU_THRESHOLD and
+            record.usage_mem_avg_float < cls.IDLE_MEM_THRESHOLD
         )
 
     @classmethod
@@ -78,40 +220,78 @@ class CostAnalyzer:
         Returns:
             AnalysisSummary with findings
         """
-        if not records:
-            return AnalysisSummary(
-                total_records=0,
-                total_daily_cost=0.0,
-                total_monthly_cost_estimate=0.0,
-                underutilized_count=0,
-                idle_count=0,
-                high_cost_anomaly_count=0,
-                potential_monthly_savings=0.0,
-                underutilized_resources=[],
-                idle_resources=[],
-                high_cost_anomalies=[]
-            )
+        return cls.analyze_records_arrays(CostArrays.from_records(records))
+
+    @classmethod
+    def analyze_records_arrays(cls, arrays: CostArrays) -> AnalysisSummary:
+        """
+        Analyze column-stored cost records and generate summary.
+        
+        Classification runs as vectorized NumPy masks over the columns;
+        CostRecordResponse objects are only built for flagged records.
+        
+        Args:
+            arrays: Cost records in structure-of-arrays form
+            
+        Returns:
+            AnalysisSummary with findings
+        """
+        if len(arrays) == 0:
+            return cls._build_summary(0, 0.0, [], [], [], 0.0)
 
         # Calculate average cost
-        total_daily_cost = sum(r.daily_cost for r in records)
-        avg_cost = total_daily_cost / len(records)
+        total_daily_cost = float(arrays.cost.sum())
+        avg_cost = total_daily_cost / len(arrays)
+
+        underutilized, idle, anomalies, potential_savings = cls._classify(
+            arrays, avg_cost
+        )
+
+        return cls._build_summary(
+            len(arrays),
+            total_daily_cost,
+            underutilized,
+            idle,
+            anomalies,
+            potential_savings
+        )
+
+    @classmethod
+    def _classify(
+        cls,
+        arrays: CostArrays,
+        avg_cost: float
+    ) -> Tuple[List[CostRecordResponse], List[CostRecordResponse], List[CostRecordResponse], float]:
+        """Flag records and accumulate savings; returns (underutilized, idle, anomalies, savings)"""
+        # Classify all records at once (same criteria as the is_* methods)
+        underutilized_mask = (
+            (arrays.status == STATUS_CODES["active"]) &
+            (arrays.cpu < cls.UNDERUTILIZED_CPU_THRESHOLD) &
+            (arrays.mem < cls.UNDERUTILIZED_MEM_THRESHOLD)
+        )
+        idle_mask = (arrays.status == STATUS_CODES["idle"]) | (
+            (arrays.cpu < cls.IDLE_CPU_THRESHOLD) &
+            (arrays.mem < cls.IDLE_MEM_THRESHOLD)
+        )
+        anomaly_mask = arrays.cost > (avg_cost * cls.HIGH_COST_MULTIPLIER)
 
-        # Analyze each record
+        # Build responses only for flagged records and accumulate savings
         underutilized = []
         idle = []
         anomalies = []
+        potential_savings = 0.0
 
-        for record in records:
-            is_underutilized = cls.is_underutilized(record)
-            is_idle = cls.is_idle(record)
-            is_anomaly = cls.is_high_cost_anomaly(record, avg_cost)
-
-            response = CostRecordResponse.from_cost_record(
-                record,
-                is_underutilized,
-                is_idle,
-                is_anomaly
-            )
+        flagged = np.flatnonzero(underutilized_mask | idle_mask | anomaly_mask)
+        responses = arrays.responses(
+            flagged,
+            underutilized_mask[flagged],
+            idle_mask[flagged],
+            anomaly_mask[flagged]
+        )
+        for response in responses:
+            is_underutilized = response.is_underutilized
+            is_idle = response.is_idle
+            is_anomaly = response.is_high_cost_anomaly
 
             if is_underutilized:
                 underutilized.append(response)
@@ -120,25 +300,29 @@ class CostAnalyzer:
             if is_anomaly:
                 anomalies.append(response)
 
-        # Calculate potential savings
-        potential_savings = 0.0
-        
-        # Savings from underutilized resources (can downsize)
-        for resource in underutilized:
-            if not resource.is_idle:  # Don't double-count
-                potential_savings += resource.monthly_cost_estimate * cls.SAVINGS_ESTIMATE_UNDERUTILIZED
-        
-        # Savings from idle resources (can stop/terminate)
-        for resource in idle:
-            potential_savings += resource.monthly_cost_estimate * cls.SAVINGS_ESTIMATE_IDLE
-        
-        # Savings from high-cost anomalies (optimization opportunities)
-        for resource in anomalies:
-            if not resource.is_idle and not resource.is_underutilized:  # Don't double-count
-                potential_savings += resource.monthly_cost_estimate * cls.SAVINGS_ESTIMATE_ANOMALY
+            # Count each resource's savings once, by priority:
+            # idle (stop/terminate) > underutilized (downsize) > anomaly (optimize)
+            if is_idle:
+                potential_savings += response.monthly_cost_estimate * cls.SAVINGS_ESTIMATE_IDLE
+            elif is_underutilized:
+                potential_savings += response.monthly_cost_estimate * cls.SAVINGS_ESTIMATE_UNDERUTILIZED
+            elif is_anomaly:
+                potential_savings += response.monthly_cost_estimate * cls.SAVINGS_ESTIMATE_ANOMALY
 
+        return underutilized, idle, anomalies, potential_savings
+
+    @staticmethod
+    def _build_summary(
+        total_records: int,
+        total_daily_cost: float,
+        underutilized: List[CostRecordResponse],
+        idle: List[CostRecordResponse],
+        anomalies: List[CostRecordResponse],
+        potential_savings: float
+    ) -> AnalysisSummary:
+        """Assemble AnalysisSummary from classification results"""
         return AnalysisSummary(
-            total_records=len(records),
+            total_records=total_records,
             total_daily_cost=total_daily_cost,
             total_monthly_cost_estimate=total_daily_cost * 30,
             underutilized_count=len(underutilized),
@@ -149,3 +333,4 @@ class CostAnalyzer:
             idle_resources=idle,
             high_cost_anomalies=anomalies
         )
+
@@ -0,0 +1,70 @@
+"""
+Exact-match response cache for LLM calls.
+Avoids re-sending identical prompts to OpenAI while the underlying data is unchanged.
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LLMCache:
+    """In-memory LRU cache with TTL expiry for LLM responses"""
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_entries: int = 128):
+        """
+        Initialize LLM cache.
+
+        Args:
+            ttl_seconds: Seconds an entry stays valid (default: 1 hour)
+            max_entries: Maximum entries kept before evicting the least recently used
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Build a SHA-256 key from the canonicalized (sorted, JSON-encoded) prompt parts"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key, evicting the oldest entry when full"""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached entries (counters are kept)"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache hit/miss counters and current size"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries)
+        }
@@ -6,20 +6,26 @@ import csv
 import io
 import os
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-import pandas as pd
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Dict, Any
+import orjson
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.models import (
     CostRecord,
+    CostRecordRaw,
     CostRecordResponse,
+    ResourceStatus,
     AnalysisSummary,
     CostSavingsReport,
-    CSVUploadResponse
+    CSVUploadResponse,
+    ReportResult,
+    BatchReportSubmission,
+    BatchReportStatus
 )
-from app.analysis import CostAnalyzer
+from app.analysis import CostAnalyzer, CostArrays
 from app.ai_service import AIService
 from app.services.analysis import (
     load_csv_to_dataframe,
@@ -32,7 +38,8 @@ from app.services.analysis import (
 app = FastAPI(root_path="/cloudsavings-ai", 
     title="AI Ops Cost Analyzer",
     description="AI-powered cloud cost analysis and optimization recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -45,10 +52,18 @@ app.add_middleware(
 )
 
 # In-memory storage (in production, use a database)
-cost_records_store: List[CostRecord] = []
+# Records are kept column-wise (one NumPy array per field), see CostArrays
+cost_records_store: CostArrays = CostArrays.from_records([])
+
+# Derived state, rebuilt whenever cost_records_store is replaced
+_cached_summary: Optional[AnalysisSummary] = None
+_cached_avg_cost: float = 0.0
+_records_by_service: Dict[str, int] = {}  # service -> row index
 
 # Business Logic: Default CSV path for analysis
 DEFAULT_CSV_PATH = "dummy_data.csv"
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_CSV_FILE = str(PROJECT_ROOT / DEFAULT_CSV_PATH)
 
 # Initialize services
 cost_analyzer = CostAnalyzer()
@@ -56,6 +71,99 @@ ai_service = AIService(
     use_mock=not bool(os.getenv("OPENAI_API_KEY")),
     api_key=os.getenv("OPENAI_API_KEY")
 )
+_mock_ai_service = AIService(use_mock=True)
+
+
+@app.on_event("shutdown")
+async def shutdown_ai_service():
+    """Close the OpenAI HTTP connection pool on shutdown"""
+    await ai_service.close()
+
+
+def _store_cost_records(records: CostArrays) -> AnalysisSummary:
+    """
+    Replace the in-memory store and rebuild derived state.
+    
+    The analysis summary, average daily cost and service lookup index are
+    computed once here so read endpoints don't rescan the store per request.
+    """
+    global cost_records_store, _cached_summary, _cached_avg_cost, _records_by_service
+    
+    # Derive everything first so a failing analysis leaves the previous store intact
+    summary = cost_analyzer.analyze_records_arrays(records)
+    avg_cost = summary.total_daily_cost / len(records) if len(records) else 0.0
+    
+    # Keep the first row per service, matching the previous linear-scan lookup
+    by_service: Dict[str, int] = {}
+    for i, service in enumerate(records.service):
+        by_service.setdefault(service, i)
+    
+    cost_records_store = records
+    _cached_summary = summary
+    _cached_avg_cost = avg_cost
+    _records_by_service = by_service
+    
+    return summary
+
+
+def _iter_cost_records(rows: Iterable[Dict[str, str]]) -> Iterator[CostRecordRaw]:
+    """
+    Parse CSV rows into CostRecordRaw objects, yielding them one at a time.
+    
+    Rows are checked here with the same rules as CostRecord (non-negative
+    cost, known status) instead of running Pydantic validation per row.
+    Invalid rows are skipped and logged so one bad line doesn't reject the file.
+    """
+    # Bind once to skip the per-row attribute lookup on each status string
+    lower = str.lower
+    
+    for row in rows:
+        try:
+            # Parse date
+            date_obj = datetime.strptime(row['date'], '%Y-%m-%d').date()
+            
+            daily_cost = float(row['daily_cost'])
+            if not daily_cost >= 0:
+                raise ValueError(f"daily_cost must be >= 0, got {daily_cost}")
+            
+            # Create CostRecordRaw
+            record = CostRecordRaw(
+                service=row['service'],
+                region=row['region'],
+                instance_type=row['instance_type'],
+                daily_cost=daily_cost,
+                usage_cpu_avg=row['usage_cpu_avg'],
+                usage_mem_avg=row['usage_mem_avg'],
+                date=date_obj,
+                status=ResourceStatus(lower(row['status'])).value,
+                # Parse percentages once here; analysis reads the floats directly
+                usage_cpu_avg_float=float(row['usage_cpu_avg'].rstrip('%')),
+                usage_mem_avg_float=float(row['usage_mem_avg'].rstrip('%'))
+            )
+        except Exception as e:
+            # Skip invalid rows but log error
+            print(f"Error parsing row: {row}, Error: {e}")
+            continue
+        
+        yield record
+
+
+def _read_csv_upload(file: UploadFile) -> CostArrays:
+    """
+    Stream an uploaded CSV into column arrays row by row.
+    
+    The upload is decoded incrementally instead of being read into memory
+    as bytes and then again as a str, and each validated row goes straight
+    into the column arrays, so peak memory stays independent of the file
+    size (beyond the columns themselves).
+    """
+    text_stream = io.TextIOWrapper(file.file, encoding='utf-8', newline='')
+    try:
+        return CostArrays.from_records(_iter_cost_records(csv.DictReader(text_stream)))
+    finally:
+        # Detach so the wrapper doesn't close the underlying upload file
+        text_stream.detach()
+
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -74,6 +182,8 @@ async def root():
             "analyze_pandas": "POST /analyze (uses Pandas, detects waste, generates AI summary)",
             "analyze": "GET /api/v1/analyze",
             "generate_report": "/api/v1/generate-report",
+            "generate_reports": "POST /api/v1/generate-reports",
+            "batch_report": "POST /api/v1/batch-report",
             "health": "/health"
         }
     })
@@ -82,7 +192,11 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "records_count": len(cost_records_store)}
+    return {
+        "status": "healthy",
+        "records_count": len(cost_records_store),
+        "llm_cache": ai_service.cache.stats()
+    }
 
 
 @app.post("/api/v1/upload-csv", response_model=CSVUploadResponse)
@@ -97,49 +211,17 @@ async def upload_csv(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="File must be a CSV file")
     
     try:
-        # Read file content
-        contents = await file.read()
-        text = contents.decode('utf-8')
-        
-        # Parse CSV
-        csv_reader = csv.DictReader(io.StringIO(text))
-        records = []
-        
-        for row in csv_reader:
-            try:
-                # Parse date
-                from datetime import datetime
-                date_obj = datetime.strptime(row['date'], '%Y-%m-%d').date()
-                
-                # Create CostRecord
-                record = CostRecord(
-                    service=row['service'],
-                    region=row['region'],
-                    instance_type=row['instance_type'],
-                    daily_cost=float(row['daily_cost']),
-                    usage_cpu_avg=row['usage_cpu_avg'],
-                    usage_mem_avg=row['usage_mem_avg'],
-                    date=date_obj,
-                    status=row['status'].lower()
-                )
-                records.append(record)
-            except Exception as e:
-                # Skip invalid rows but log error
-                print(f"Error parsing row: {row}, Error: {e}")
-                continue
+        # Parse CSV while streaming the upload
+        records = _read_csv_upload(file)
         
-        if not records:
+        if len(records) == 0:
             raise HTTPException(
                 status_code=400,
                 detail="No valid records found in CSV file"
             )
         
-        # Store records (in production, save to database)
-        global cost_records_store
-        cost_records_store = records
-        
-        # Perform analysis
-        analysis_summary = cost_analyzer.analyze_records(records)
+        # Store records and perform analysis (in production, save to database)
+        analysis_summary = _store_cost_records(records)
         
         return CSVUploadResponse(
             message=f"Successfully processed {len(records)} records",
@@ -160,14 +242,13 @@ async def analyze_costs():
     Analyze uploaded cost data and return summary.
     Detects underutilized resources, idle resources, and high-cost anomalies.
     """
-    if not cost_records_store:
+    if len(cost_records_store) == 0:
         raise HTTPException(
             status_code=404,
             detail="No cost data available. Please upload a CSV file first."
         )
     
-    analysis_summary = cost_analyzer.analyze_records(cost_records_store)
-    return analysis_summary
+    return _cached_summary
 
 
 @app.post("/analyze")
@@ -204,31 +285,28 @@ async def analyze_with_pandas(
         # Business Logic: Determine CSV file path
         if csv_path is None:
             # Use default dummy_data.csv in project root
-            project_root = Path(__file__).parent.parent
-            csv_path = str(project_root / DEFAULT_CSV_PATH)
+            csv_path = DEFAULT_CSV_FILE
         else:
             # Use provided path
             csv_path = str(Path(csv_path))
         
         # Business Logic: Load CSV into Pandas DataFrame
-        # This allows efficient data manipulation and analysis
-        if not os.path.exists(csv_path):
-            raise HTTPException(
-                status_code=404,
-                detail=f"CSV file not found: {csv_path}"
-            )
-        
+        # This allows efficient data manipulation and analysis.
+        # The parsed frame is cached until the file's mtime or size changes.
         df = load_csv_to_dataframe(csv_path)
         
         # Business Logic: Apply waste detection rules
         # Flags resources that are idle or have CPU usage < 5%
-        df_with_waste = detect_waste(df)
+        # Returns a boolean mask; the cached frame is never copied or modified
+        is_waste = detect_waste(df)
         
-        # Business Logic: Extract wasteful resources for AI analysis
-        waste_df = df_with_waste[df_with_waste['is_waste'] == True].copy()
+        # Business Logic: Extract wasteful resources once for the summary and AI analysis
+        # Positional boolean selection; read-only, so the result is not copied
+        waste_df = df.iloc[is_waste]
         
         # Business Logic: Generate summary statistics
-        waste_summary = get_waste_summary(df_with_waste)
+        # Its waste_resources records are returned as-is in the response below
+        waste_summary = get_waste_summary(df, waste_df)
         
         # Business Logic: Generate AI-powered natural language summary
         # Uses OpenAI to analyze waste data and suggest which resources to turn off
@@ -244,10 +322,11 @@ async def analyze_with_pandas(
             "ai_summary": ai_summary,
             "waste_count": len(waste_df),
             "total_resources": len(df),
-            "waste_resources": waste_df.to_dict('records') if len(waste_df) > 0 else []
+            "waste_resources": waste_summary['waste_resources']
         }
         
-        return response
+        # Large waste record lists serialize directly with orjson
+        return ORJSONResponse(content=response)
         
     except FileNotFoundError:
         raise HTTPException(
@@ -272,23 +351,19 @@ async def generate_cost_savings_report(
     Generate AI-powered cost savings report.
     Uses OpenAI to generate comprehensive recommendations based on cost analysis.
     """
-    if not cost_records_store:
+    if len(cost_records_store) == 0:
         raise HTTPException(
             status_code=404,
             detail="No cost data available. Please upload a CSV file first."
         )
     
-    # Perform analysis
-    analysis_summary = cost_analyzer.analyze_records(cost_records_store)
+    analysis_summary = _cached_summary
     
     # Generate AI report
-    if use_mock:
-        service = AIService(use_mock=True)
-    else:
-        service = ai_service
+    service = _mock_ai_service if use_mock else ai_service
     
     try:
-        report = service.generate_cost_savings_report(analysis_summary)
+        report = await service.generate_cost_savings_report(analysis_summary)
         return report
     except Exception as e:
         raise HTTPException(
@@ -297,53 +372,120 @@ async def generate_cost_savings_report(
         )
 
 
-@app.get("/api/v1/records", response_model=List[CostRecordResponse])
-async def get_all_records():
-    """Get all cost records with analysis flags"""
-    if not cost_records_store:
-        return []
+@app.post("/api/v1/generate-reports", response_model=List[ReportResult])
+async def generate_cost_savings_reports(
+    files: List[UploadFile] = File(...),
+    use_mock: bool = Query(
+        False,
+        description="Use mock AI service instead of OpenAI (for testing)"
+    )
+):
+    """
+    Generate AI-powered cost savings reports for several CSV files at once.
+    Reports are generated concurrently (bounded) and returned in upload order;
+    a file whose report failed has an error instead of a report.
+    """
+    summaries = []
+    for file in files:
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(
+                status_code=400,
+                detail=f"File must be a CSV file: {file.filename}"
+            )
+        
+        records = _read_csv_upload(file)
+        if len(records) == 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No valid records found in CSV file: {file.filename}"
+            )
+        summaries.append(cost_analyzer.analyze_records_arrays(records))
     
-    analysis_summary = cost_analyzer.analyze_records(cost_records_store)
+    service = _mock_ai_service if use_mock else ai_service
+    results = await service.generate_many(summaries)
     
-    # Build response with all records
-    all_responses = []
-    for record in cost_records_store:
-        is_underutilized = cost_analyzer.is_underutilized(record)
-        is_idle = cost_analyzer.is_idle(record)
-        avg_cost = sum(r.daily_cost for r in cost_records_store) / len(cost_records_store)
-        is_anomaly = cost_analyzer.is_high_cost_anomaly(record, avg_cost)
-        
-        response = CostRecordResponse.from_cost_record(
-            record,
-            is_underutilized,
-            is_idle,
-            is_anomaly
+    return [
+        ReportResult(filename=file.filename, error=f"Error generating AI report: {result}")
+        if isinstance(result, Exception)
+        else ReportResult(filename=file.filename, report=result)
+        for file, result in zip(files, results)
+    ]
+
+
+@app.post("/api/v1/batch-report", response_model=BatchReportSubmission)
+async def submit_batch_report(files: List[UploadFile] = File(...)):
+    """
+    Submit cost savings reports for several CSV files via the OpenAI Batch API.
+    
+    Intended for non-interactive workloads (nightly reports, multi-tenant
+    processing): batch jobs cost 50% less and complete within 24 hours.
+    Poll GET /api/v1/batch-report/{batch_id} for the results; the response
+    maps each request's custom_id to its uploaded filename.
+    """
+    if ai_service.use_mock:
+        raise HTTPException(
+            status_code=503,
+            detail="Batch reports require the OpenAI API. Set OPENAI_API_KEY."
         )
-        all_responses.append(response)
     
-    return all_responses
+    summaries = []
+    for file in files:
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(
+                status_code=400,
+                detail=f"File must be a CSV file: {file.filename}"
+            )
+        
+        records = _read_csv_upload(file)
+        if len(records) == 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No valid records found in CSV file: {file.filename}"
+            )
+        summaries.append((file.filename, cost_analyzer.analyze_records_arrays(records)))
+    
+    try:
+        return await ai_service.submit_batch_report(summaries)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error submitting batch report: {str(e)}"
+        )
 
 
-@app.get("/api/v1/records/{service_name}", response_model=CostRecordResponse)
-async def get_record_by_service(service_name: str):
-    """Get cost record for a specific service"""
-    if not cost_records_store:
-        raise HTTPException(status_code=404, detail="No cost data available")
+@app.get("/api/v1/batch-report/{batch_id}", response_model=BatchReportStatus)
+async def get_batch_report(batch_id: str):
+    """
+    Poll a Batch API report job.
     
-    record = next(
-        (r for r in cost_records_store if r.service == service_name),
-        None
-    )
+    Once the job has finished, one report or error per uploaded file is
+    returned, keyed by custom_id and filename; the job is then forgotten
+    and later polls return 404.
+    """
+    if ai_service.use_mock:
+        raise HTTPException(
+            status_code=503,
+            detail="Batch reports require the OpenAI API. Set OPENAI_API_KEY."
+        )
     
-    if not record:
+    try:
+        return await ai_service.get_batch_report(batch_id)
+    except KeyError:
         raise HTTPException(
             status_code=404,
-            detail=f"Service '{service_name}' not found"
+            detail=f"Batch '{batch_id}' not found"
         )
-    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error retrieving batch report: {str(e)}"
+        )
+
+
+def _build_record_response(record: CostRecord, avg_cost: float) -> CostRecordResponse:
+    """Build a CostRecordResponse with analysis flags against the given average cost"""
     is_underutilized = cost_analyzer.is_underutilized(record)
     is_idle = cost_analyzer.is_idle(record)
-    avg_cost = sum(r.daily_cost for r in cost_records_store) / len(cost_records_store)
     is_anomaly = cost_analyzer.is_high_cost_anomaly(record, avg_cost)
     
     return CostRecordResponse.from_cost_record(
@@ -354,6 +496,56 @@ async def get_record_by_service(service_name: str):
     )
 
 
+@app.get("/api/v1/records", response_model=List[CostRecordResponse])
+async def get_all_records():
+    """Get all cost records with analysis flags"""
+    if len(cost_records_store) == 0:
+        return []
+    
+    # Build response with all records, serialized directly with orjson
+    return ORJSONResponse(content=[
+        _build_record_response(cost_records_store.record(i), _cached_avg_cost).model_dump()
+        for i in range(len(cost_records_store))
+    ])
+
+
+@app.get("/api/v1/records.ndjson")
+async def stream_all_records():
+    """
+    Stream all cost records with analysis flags as newline-delimited JSON.
+    
+    Each record is serialized and sent as it is built, so memory stays flat
+    regardless of store size (unlike /api/v1/records, which builds the full list).
+    """
+    # Snapshot the store and its average cost together so a concurrent upload
+    # doesn't change either mid-stream
+    records = cost_records_store
+    avg_cost = _cached_avg_cost
+    
+    def generate_lines():
+        for i in range(len(records)):
+            yield orjson.dumps(_build_record_response(records.record(i), avg_cost).model_dump()) + b"\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+
+@app.get("/api/v1/records/{service_name}", response_model=CostRecordResponse)
+async def get_record_by_service(service_name: str):
+    """Get cost record for a specific service"""
+    if len(cost_records_store) == 0:
+        raise HTTPException(status_code=404, detail="No cost data available")
+    
+    row = _records_by_service.get(service_name)
+    
+    if row is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Service '{service_name}' not found"
+        )
+    
+    return _build_record_response(cost_records_store.record(row), _cached_avg_cost)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -5,12 +5,17 @@ usage_cpu_avg, usage_mem_avg, date, status
 """
 
 from __future__ import annotations
+from dataclasses import dataclass
 from datetime import date as date_type
-from typing import Optional, List
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Any, Dict, Optional, List
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from enum import Enum
 
 
+# Translation table that deletes '%' from usage strings, e.g. "12%" -> "12"
+STRIP_PERCENT = str.maketrans('', '', '%')
+
+
 class ResourceStatus(str, Enum):
     """Resource status enumeration"""
     ACTIVE = "active"
@@ -29,14 +34,46 @@ class CostRecord(BaseModel):
     usage_mem_avg: str = Field(..., description="Average memory usage percentage")
     date: date_type = Field(..., description="Date of the record")
     status: ResourceStatus = Field(..., description="Resource status")
+    usage_cpu_avg_float: float = Field(..., description="CPU usage as float")
+    usage_mem_avg_float: float = Field(..., description="Memory usage as float")
 
     model_config = ConfigDict(use_enum_values=True)
 
+    @model_validator(mode="before")
+    @classmethod
+    def parse_usage_floats(cls, data: Any) -> Any:
+        """Parse usage percentages once unless the caller already supplied the floats"""
+        if isinstance(data, dict):
+            for field in ("usage_cpu_avg", "usage_mem_avg"):
+                float_field = f"{field}_float"
+                if data.get(float_field) is None and isinstance(data.get(field), str):
+                    data = {**data, float_field: float(data[field].translate(STRIP_PERCENT))}
+        return data
+
+
+@dataclass(slots=True)
+class CostRecordRaw:
+    """
+    Plain mirror of CostRecord for bulk CSV ingest.
+    
+    Rows are checked by the ingest code itself, so per-row Pydantic
+    validation is skipped; CostRecord is only built for records served
+    by the API.
+    """
+    service: str
+    region: str
+    instance_type: str
+    daily_cost: float
+    usage_cpu_avg: str
+    usage_mem_avg: str
+    date: date_type
+    status: str
+    usage_cpu_avg_float: float
+    usage_mem_avg_float: float
+
 
 class CostRecordResponse(CostRecord):
     """Response model for cost records with computed fields"""
-    usage_cpu_avg_float: float = Field(..., description="CPU usage as float")
-    usage_mem_avg_float: float = Field(..., description="Memory usage as float")
     monthly_cost_estimate: float = Field(..., description="Estimated monthly cost")
     is_underutilized: bool = Field(..., description="Whether resource is underutilized")
     is_idle: bool = Field(..., description="Whether resource is idle")
@@ -50,14 +87,15 @@ class CostRecordResponse(CostRecord):
         is_idle: bool,
         is_high_cost_anomaly: bool
     ):
-        """Create response from CostRecord with analysis flags"""
-        cpu_float = float(record.usage_cpu_avg.replace('%', '')) if isinstance(record.usage_cpu_avg, str) else record.usage_cpu_avg
-        mem_float = float(record.usage_mem_avg.replace('%', '')) if isinstance(record.usage_mem_avg, str) else record.usage_mem_avg
+        """
+        Create response from CostRecord with analysis flags.
         
-        return cls(
-            **record.model_dump(),
-            usage_cpu_avg_float=cpu_float,
-            usage_mem_avg_float=mem_float,
+        The record is already validated, so the response is built with
+        model_construct to skip a second validation pass.
+        """
+        # Field values are read straight from the record, without a model_dump copy
+        return cls.model_construct(
+            **record.__dict__,
             monthly_cost_estimate=record.daily_cost * 30,
             is_underutilized=is_underutilized,
             is_idle=is_idle,
@@ -79,6 +117,17 @@ class AnalysisSummary(BaseModel):
     high_cost_anomalies: List['CostRecordResponse'] = Field(default_factory=list)
 
 
+class CostSavingsReportLLM(BaseModel):
+    """Structured output schema requested from the LLM"""
+    summary: str = Field(..., description="Executive summary (2-3 sentences)")
+    findings: List[str] = Field(..., description="Key findings")
+    recommendations: List[str] = Field(..., description="Actionable recommendations, prioritized")
+    priority_actions: List[str] = Field(..., description="Top 3-5 actions to take immediately")
+
+    # Strict structured outputs require additionalProperties: false
+    model_config = ConfigDict(extra="forbid")
+
+
 class CostSavingsReport(BaseModel):
     """AI-generated cost savings report"""
     summary: str = Field(..., description="Executive summary of the report")
@@ -89,6 +138,32 @@ class CostSavingsReport(BaseModel):
     analysis_summary: 'AnalysisSummary'
 
 
+class ReportResult(BaseModel):
+    """Outcome of one report in a multi-file report request"""
+    custom_id: Optional[str] = Field(None, description="Batch API request id (batch reports only)")
+    filename: str = Field(..., description="Uploaded CSV file the report is for")
+    report: Optional['CostSavingsReport'] = Field(None, description="Generated report, if successful")
+    error: Optional[str] = Field(None, description="Why report generation failed, if it did")
+
+
+class BatchReportSubmission(BaseModel):
+    """Response after submitting a Batch API report job"""
+    batch_id: str = Field(..., description="OpenAI batch id")
+    requests_submitted: int = Field(..., description="Number of reports requested")
+    requests: Dict[str, str] = Field(default_factory=dict, description="custom_id -> uploaded filename")
+
+
+class BatchReportStatus(BaseModel):
+    """Status of a Batch API report job"""
+    batch_id: str = Field(..., description="OpenAI batch id")
+    status: str = Field(..., description="Batch status reported by OpenAI")
+    requests_submitted: int = Field(..., description="Number of reports requested")
+    results: List['ReportResult'] = Field(
+        default_factory=list,
+        description="One report or error per request, in submission order, once the batch has finished"
+    )
+
+
 class CSVUploadResponse(BaseModel):
     """Response after CSV upload"""
     message: str
@@ -100,4 +175,6 @@ class CSVUploadResponse(BaseModel):
 # This prevents RecursionError in Pydantic v2 when generating OpenAPI schema
 AnalysisSummary.model_rebuild()
 CostSavingsReport.model_rebuild()
+ReportResult.model_rebuild()
+BatchReportStatus.model_rebuild()
 CSVUploadResponse.model_rebuild()
@@ -8,10 +8,48 @@ Waste is defined as resources that are either:
 These resources are prime candidates for termination or shutdown to reduce costs.
 """
 
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
 from pathlib import Path
+from app.models import STRIP_PERCENT
+
+
+# Business Logic: Static system message for the waste summary prompt
+# Built once at import; each call only allocates the user message
+_WASTE_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": (
+        "You are a cloud cost optimization expert. Analyze the provided "
+        "wasteful cloud resources and generate a concise, actionable summary "
+        "suggesting which resources should be turned off. Be specific about "
+        "resource names and potential savings."
+    )
+}
+
+# Business Logic: OpenAI client reused across calls (created on first use)
+# Keeps the HTTP connection pool alive between /analyze requests
+_openai_client: Optional[Any] = None
+_openai_client_key: Optional[str] = None
+
+
+# Business Logic: Explicit column schema for the cost CSV
+# Text columns are Arrow-backed strings instead of generic object columns;
+# low-cardinality region/instance_type are categoricals (small integer codes).
+# daily_cost stays float64 so cost sums match the rest of the API exactly.
+# Columns missing from a given file are simply ignored by read_csv.
+CSV_DTYPES = {
+    'service': 'string[pyarrow]',
+    'region': 'category',
+    'instance_type': 'category',
+    'daily_cost': 'float64',
+    'usage_cpu_avg': 'string[pyarrow]',
+    'usage_mem_avg': 'string[pyarrow]',
+    'date': 'string[pyarrow]',
+    'status': 'string[pyarrow]',
+}
 
 
 def load_csv_to_dataframe(csv_path: str) -> pd.DataFrame:
@@ -19,16 +57,73 @@ def load_csv_to_dataframe(csv_path: str) -> pd.DataFrame:
     Business Logic: Load CSV cost data into Pandas DataFrame for analysis.
     
     This function reads the cost data CSV file and converts it into a DataFrame
-    for efficient data manipulation and analysis.
+    for efficient data manipulation and analysis. Parsing uses Arrow's
+    multi-threaded CSV reader with an explicit schema, so no per-column type
+    inference is needed and text stays in compact Arrow buffers.
+    
+    Dates are kept as 'YYYY-MM-DD' strings so API responses keep their format.
+    
+    Usage percentages are parsed once here into numeric '<column>_float'
+    columns so detection and reporting don't re-parse the strings, status
+    is lowercased once and stored as a categorical, and a
+    'monthly_cost_estimate' column (daily_cost * 30) is added.
+    
+    Parsed frames are cached by (path, mtime, size), so repeated calls for an
+    unchanged file return the same DataFrame without re-reading it. Callers
+    must treat the result as read-only.
     
     Args:
         csv_path: Path to the CSV file
         
     Returns:
         DataFrame with cost data
+        
+    Raises:
+        FileNotFoundError: If csv_path does not exist
+        ValueError: If the file cannot be parsed
+    """
+    stat = os.stat(csv_path)
+    return _load_csv_cached(csv_path, stat.st_mtime_ns, stat.st_size)
+
+
+# Columns added by _load_csv_cached that are not part of the CSV schema
+_LOAD_DERIVED_COLUMNS = ('usage_cpu_avg_float', 'usage_mem_avg_float', 'monthly_cost_estimate')
+
+
+@lru_cache(maxsize=8)
+def _load_csv_cached(csv_path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    """
+    Business Logic: Parse and prepare a CSV; cached per file version.
+    
+    mtime_ns and size are only part of the cache key, so a modified file
+    gets a new entry and is parsed again.
     """
     try:
-        df = pd.read_csv(csv_path)
+        df = pd.read_csv(
+            csv_path,
+            engine='pyarrow',
+            dtype_backend='pyarrow',
+            dtype=CSV_DTYPES
+        )
+        
+        # Business Logic: Parse "12%" style usage strings to floats once at load
+        # Unparseable values become NaN and are never flagged by threshold rules
+        for col in ('usage_cpu_avg', 'usage_mem_avg'):
+            if col in df.columns:
+                df[f'{col}_float'] = pd.to_numeric(
+                    df[col].astype(str).str.rstrip('%'),
+                    errors='coerce'
+                ).to_numpy(dtype=np.float64)
+        
+        # Business Logic: Monthly cost estimate (30 days) computed once per file
+        if 'daily_cost' in df.columns:
+            df['monthly_cost_estimate'] = df['daily_cost'].to_numpy(dtype=np.float64) * 30
+        
+        # Business Logic: Normalize status case once; as a categorical, status
+        # checks compare small integer codes instead of strings
+        if 'status' in df.columns:
+            df['status'] = df['status'].str.lower().astype('category')
+        
         return df
     except Exception as e:
         raise ValueError(f"Error loading CSV file: {str(e)}")
@@ -39,7 +134,9 @@ def parse_usage_percentage(usage_str: str) -> float:
     Business Logic: Parse percentage strings to numeric values.
     
     Handles percentage values that may be stored as strings (e.g., "12%", "5%")
-    and converts them to float for mathematical operations.
+    and converts them to float for mathematical operations. Not used by the
+    DataFrame pipeline, which parses whole columns at load; kept for API
+    compatibility.
     
     Args:
         usage_str: Percentage string (e.g., "12%" or "12")
@@ -48,11 +145,11 @@ def parse_usage_percentage(usage_str: str) -> float:
         Float value of the percentage
     """
     if isinstance(usage_str, str):
-        return float(usage_str.replace('%', ''))
+        return float(usage_str.translate(STRIP_PERCENT))
     return float(usage_str)
 
 
-def detect_waste(df: pd.DataFrame) -> pd.DataFrame:
+def detect_waste(df: pd.DataFrame) -> np.ndarray:
     """
     Business Logic: Rule-based waste detection algorithm.
     
@@ -65,36 +162,39 @@ def detect_waste(df: pd.DataFrame) -> pd.DataFrame:
     safely terminated or stopped to reduce cloud costs.
     
     Args:
-        df: DataFrame with cost data containing columns:
-            - usage_cpu_avg: CPU usage percentage (string or numeric)
-            - status: Resource status (string)
+        df: DataFrame from load_csv_to_dataframe() containing columns:
+            - usage_cpu_avg_float: CPU usage percentage (parsed at load)
+            - status: Resource status (lowercase categorical)
             
     Returns:
-        DataFrame with additional 'is_waste' boolean column indicating
-        which resources are flagged as waste
+        Boolean NumPy mask, one entry per row, True where the resource is
+        flagged as waste. The DataFrame itself is not copied or modified.
     """
-    # Create a copy to avoid modifying the original DataFrame
-    df_result = df.copy()
+    # Business Logic: Empty input has nothing to flag
+    if len(df) == 0:
+        return np.zeros(0, dtype=bool)
     
-    # Business Logic: Parse CPU usage to numeric if it's a string
-    df_result['cpu_usage_numeric'] = df_result['usage_cpu_avg'].apply(parse_usage_percentage)
+    # Business Logic: CPU usage was parsed to numeric once at load time
+    cpu = df['usage_cpu_avg_float'].to_numpy(dtype=np.float64)
     
-    # Business Logic: Rule 1 - Flag resources with status == 'idle'
-    # Idle resources are not serving any purpose and should be terminated
-    is_idle = df_result['status'].str.lower() == 'idle'
-    
-    # Business Logic: Rule 2 - Flag resources with CPU usage < 5%
+    # Business Logic: Rule 2 (CPU usage < 5%)
     # Resources using less than 5% CPU are extremely underutilized and
-    # likely candidates for downsizing or termination
-    low_cpu = df_result['cpu_usage_numeric'] < 5.0
-    
-    # Business Logic: Combine rules - a resource is waste if it meets either condition
-    df_result['is_waste'] = is_idle | low_cpu
-    
-    return df_result
+    # likely candidates for downsizing or termination.
+    is_waste = cpu < 5.0
+    
+    # Business Logic: Rule 1 (status == 'idle'), OR-ed into the same mask
+    # Idle resources are not serving any purpose and should be terminated.
+    # Status is a lowercase categorical, so this is a single integer compare
+    # against the 'idle' category code; a file without idle rows has no code.
+    status = df['status'].cat
+    if 'idle' in status.categories:
+        idle_code = status.categories.get_loc('idle')
+        np.logical_or(is_waste, status.codes.to_numpy() == idle_code, out=is_waste)
+    
+    return is_waste
 
 
-def get_waste_summary(df: pd.DataFrame) -> Dict[str, Any]:
+def get_waste_summary(df: pd.DataFrame, waste_df: pd.DataFrame) -> Dict[str, Any]:
     """
     Business Logic: Generate summary statistics for waste detection.
     
@@ -105,19 +205,32 @@ def get_waste_summary(df: pd.DataFrame) -> Dict[str, Any]:
     - List of wasteful resources with details
     
     Args:
-        df: DataFrame with 'is_waste' column from detect_waste()
+        df: DataFrame with cost data
+        waste_df: Rows of df flagged by detect_waste(), selected once by the caller
         
     Returns:
         Dictionary with waste summary statistics
     """
-    waste_df = df[df['is_waste'] == True].copy()
-    
+    # Business Logic: Cost total straight from the NumPy array
+    # nansum matches pandas' sum(), which skips missing costs
     total_waste_count = len(waste_df)
-    total_daily_waste_cost = waste_df['daily_cost'].sum() if total_waste_count > 0 else 0.0
+    total_daily_waste_cost = (
+        float(np.nansum(waste_df['daily_cost'].to_numpy(dtype=np.float64)))
+        if total_waste_count > 0 else 0.0
+    )
     estimated_monthly_waste = total_daily_waste_cost * 30
     
     # Convert waste rows to list of dictionaries for API response
-    waste_resources = waste_df.to_dict('records') if total_waste_count > 0 else []
+    # Business Logic: Keep the original record shape (CSV columns plus
+    # cpu_usage_numeric and is_waste); load-time helper columns stay internal
+    waste_resources = []
+    if total_waste_count > 0:
+        waste_resources = waste_df.drop(
+            columns=list(_LOAD_DERIVED_COLUMNS), errors='ignore'
+        ).assign(
+            cpu_usage_numeric=waste_df['usage_cpu_avg_float'],
+            is_waste=True
+        ).to_dict('records')
     
     return {
         'waste_count': total_waste_count,
@@ -156,8 +269,7 @@ def generate_openai_waste_summary(waste_df: pd.DataFrame, api_key: Optional[str]
     
     # Business Logic: Use OpenAI to generate intelligent waste summary
     try:
-        import openai
-        client = openai.OpenAI(api_key=api_key)
+        client = _get_openai_client(api_key)
         
         # Build prompt with waste data
         prompt = _build_waste_analysis_prompt(waste_df)
@@ -166,15 +278,7 @@ def generate_openai_waste_summary(waste_df: pd.DataFrame, api_key: Optional[str]
         response = client.chat.completions.create(
             model="gpt-4",
             messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a cloud cost optimization expert. Analyze the provided "
-                        "wasteful cloud resources and generate a concise, actionable summary "
-                        "suggesting which resources should be turned off. Be specific about "
-                        "resource names and potential savings."
-                    )
-                },
+                _WASTE_SYSTEM_MESSAGE,
                 {
                     "role": "user",
                     "content": prompt
@@ -195,6 +299,23 @@ def generate_openai_waste_summary(waste_df: pd.DataFrame, api_key: Optional[str]
         return _generate_mock_waste_summary(waste_df)
 
 
+def _get_openai_client(api_key: str):
+    """
+    Business Logic: Return the shared OpenAI client, creating it on first use.
+    
+    The client is rebuilt only if a different API key is passed. Raises
+    ImportError if the openai package is not installed.
+    """
+    global _openai_client, _openai_client_key
+    
+    if _openai_client is None or _openai_client_key != api_key:
+        import openai
+        _openai_client = openai.OpenAI(api_key=api_key)
+        _openai_client_key = api_key
+    
+    return _openai_client
+
+
 def _build_waste_analysis_prompt(waste_df: pd.DataFrame) -> str:
     """
     Business Logic: Build prompt for OpenAI analysis.
@@ -205,21 +326,56 @@ def _build_waste_analysis_prompt(waste_df: pd.DataFrame) -> str:
     if len(waste_df) == 0:
         return "No wasteful resources found."
     
-    prompt = "Analyze these wasteful cloud resources and suggest which to turn off:\n\n"
+    header = "Analyze these wasteful cloud resources and suggest which to turn off:\n\n"
+    footer = "\nProvide a concise summary (2-3 sentences) suggesting which resources to turn off and why."
+    
+    # Iterate over column arrays instead of building a Series per row with iterrows()
+    columns = _column_arrays(
+        waste_df,
+        service='N/A',
+        instance_type='N/A',
+        region='N/A',
+        daily_cost=0,
+        usage_cpu_avg='N/A',
+        usage_mem_avg='N/A',
+        status='N/A'
+    )
+    lines = [
+        f"Resource: {service}\n"
+        f"  - Instance Type: {instance_type}\n"
+        f"  - Region: {region}\n"
+        f"  - Daily Cost: ${daily_cost:.2f}\n"
+        f"  - CPU Usage: {cpu_usage}\n"
+        f"  - Memory Usage: {mem_usage}\n"
+        f"  - Status: {status}\n"
+        "\n"
+        for service, instance_type, region, daily_cost, cpu_usage, mem_usage, status in zip(
+            *columns
+        )
+    ]
     
-    for idx, row in waste_df.iterrows():
-        prompt += f"Resource: {row.get('service', 'N/A')}\n"
-        prompt += f"  - Instance Type: {row.get('instance_type', 'N/A')}\n"
-        prompt += f"  - Region: {row.get('region', 'N/A')}\n"
-        prompt += f"  - Daily Cost: ${row.get('daily_cost', 0):.2f}\n"
-        prompt += f"  - CPU Usage: {row.get('usage_cpu_avg', 'N/A')}\n"
-        prompt += f"  - Memory Usage: {row.get('usage_mem_avg', 'N/A')}\n"
-        prompt += f"  - Status: {row.get('status', 'N/A')}\n"
-        prompt += "\n"
+    return header + "".join(lines) + footer
+
+
+def _column_values(df: pd.DataFrame, column: str, default: Any) -> np.ndarray:
+    """
+    Business Logic: Read one column as a NumPy array for row-wise formatting.
     
-    prompt += "\nProvide a concise summary (2-3 sentences) suggesting which resources to turn off and why."
+    Mirrors the row.get(column, default) fallback when the column is missing.
+    """
+    if column in df.columns:
+        return df[column].to_numpy()
+    return np.full(len(df), default, dtype=object)
+
+
+def _column_arrays(df: pd.DataFrame, **defaults: Any) -> List[np.ndarray]:
+    """
+    Business Logic: Extract several columns at once, structure-of-arrays style.
     
-    return prompt
+    Returns one array per keyword, in keyword order, so builders can
+    zip(*arrays) over rows without allocating a Series or dict per row.
+    """
+    return [_column_values(df, column, default) for column, default in defaults.items()]
 
 
 def _generate_mock_waste_summary(waste_df: pd.DataFrame) -> str:
@@ -235,23 +391,35 @@ def _generate_mock_waste_summary(waste_df: pd.DataFrame) -> str:
     total_daily_cost = waste_df['daily_cost'].sum()
     total_monthly_cost = total_daily_cost * 30
     
-    summary = f"Waste Detection Summary (Mock Response):\n\n"
-    summary += f"Found {len(waste_df)} wasteful resource(s) that should be considered for termination:\n\n"
-    
-    for idx, row in waste_df.iterrows():
-        service = row.get('service', 'Unknown')
-        daily_cost = row.get('daily_cost', 0)
-        status = row.get('status', 'unknown')
-        cpu_usage = row.get('usage_cpu_avg', 'N/A')
-        
-        summary += f"• {service}: "
+    # Collect pieces in a list and join once, instead of repeated string +=
+    parts = [
+        "Waste Detection Summary (Mock Response):\n\n",
+        f"Found {len(waste_df)} wasteful resource(s) that should be considered for termination:\n\n"
+    ]
+    
+    services, daily_costs, statuses, cpu_usages = _column_arrays(
+        waste_df,
+        service='Unknown',
+        daily_cost=0,
+        status='unknown',
+        usage_cpu_avg='N/A'
+    )
+    if 'monthly_cost_estimate' in waste_df.columns:
+        monthly_costs = waste_df['monthly_cost_estimate'].to_numpy()
+    else:
+        monthly_costs = daily_costs * 30
+    
+    for service, daily_cost, monthly_cost, status, cpu_usage in zip(
+        services, daily_costs, monthly_costs, statuses, cpu_usages
+    ):
+        parts.append(f"• {service}: ")
         if status.lower() == 'idle':
-            summary += f"Status is IDLE - should be terminated immediately. "
+            parts.append("Status is IDLE - should be terminated immediately. ")
         else:
-            summary += f"CPU usage is {cpu_usage} (below 5% threshold) - should be terminated or downsized. "
-        summary += f"Saves ${daily_cost:.2f}/day (${daily_cost * 30:.2f}/month).\n"
+            parts.append(f"CPU usage is {cpu_usage} (below 5% threshold) - should be terminated or downsized. ")
+        parts.append(f"Saves ${daily_cost:.2f}/day (${monthly_cost:.2f}/month).\n")
     
-    summary += f"\nTotal potential savings: ${total_daily_cost:.2f}/day (${total_monthly_cost:.2f}/month)."
-    summary += "\n\nNote: This is a mock response. Set OPENAI_API_KEY for AI-powered analysis."
+    parts.append(f"\nTotal potential savings: ${total_daily_cost:.2f}/day (${total_monthly_cost:.2f}/month).")
+    parts.append("\n\nNote: This is a mock response. Set OPENAI_API_KEY for AI-powered analysis.")
     
-    return summary
+    return "".join(parts)